@@ -1,33 +1,77 @@
-from datetime import date
+from datetime import date, datetime
 from decimal import Decimal
 from functools import wraps
 from http import HTTPStatus
-from typing import Optional
-
-from flask import Blueprint, abort, current_app, jsonify, request
-from flask_jwt_extended import create_access_token, get_jwt_identity, verify_jwt_in_request
-from flask_pydantic import validate
-from pydantic import Extra
-from pydantic.main import BaseModel
-from pydantic.types import constr
-from sqlalchemy.orm import joinedload
+from typing import Annotated, Optional, Union
+
+import msgspec
+import orjson
+from cachetools import TTLCache
+from flask import Blueprint, abort, current_app, g, request, stream_with_context
+from flask_jwt_extended import create_access_token, get_jwt, get_jwt_identity, verify_jwt_in_request
+from msgspec import UNSET, UnsetType
+from sqlalchemy import delete, func, insert, literal, select
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from sqlalchemy.orm import selectinload
 
 from solawi import models
-from solawi.app import app, db
+from solawi.app import app, db, json_default, jsonify
 from solawi.controller import merge
-from solawi.models import Bet, Deposit, Member, Person, Share, User
+from solawi.models import Bet, Deposit, Member, Person, Share, Station, User
 
 api = Blueprint("api", __name__)
 
 
+def changed_fields(body):
+    """Return the fields of ``body`` that were present in the request.
+
+    Fields the client did not send default to ``msgspec.UNSET`` and are
+    dropped here, so an explicit ``null`` stays distinguishable from an
+    omitted field in the PATCH endpoints.
+    """
+    return {key: value for key, value in msgspec.structs.asdict(body).items() if value is not UNSET}
+
+
+_decoders: dict[type, msgspec.json.Decoder] = {}
+
+
+def validate_body(schema):
+    """Decode and validate the JSON request body into ``schema``.
+
+    The msgspec decoder is built once per schema when the routes are
+    decorated at import time, never per request.  The decoded struct is
+    passed to the view function as the ``body`` keyword argument; invalid
+    bodies get a 400 response.
+    """
+    decoder = _decoders.get(schema)
+    if decoder is None:
+        decoder = _decoders[schema] = msgspec.json.Decoder(schema)
+
+    def wrapper(fn):
+        @wraps(fn)
+        def decorator(*args, **kwargs):
+            try:
+                kwargs["body"] = decoder.decode(request.get_data(cache=False))
+            except msgspec.DecodeError as e:
+                return jsonify(validation_error=str(e)), 400
+            return fn(*args, **kwargs)
+
+        return decorator
+
+    return wrapper
+
+
 def login_required():
     def wrapper(fn):
         @wraps(fn)
         def decorator(*args, **kwargs):
+            # The password status and user id travel as token claims (see
+            # api_login), so no User query is needed per request.
             verify_jwt_in_request()
-            current_user = User.query.filter(User.email == get_jwt_identity()).one()
-            if not current_user.password_changed_at:
+            claims = get_jwt()
+            if not claims.get("pw_ok"):
                 return abort(403)
+            g.user_id = claims.get("uid")
             return current_app.ensure_sync(fn)(*args, **kwargs)
 
         return decorator
@@ -35,19 +79,22 @@ def login_required():
     return wrapper
 
 
-class LoginSchema(BaseModel):
+class LoginSchema(msgspec.Struct, kw_only=True):
     email: str
     password: str
 
 
 @api.route("/login", methods=["POST"])
-@validate()
+@validate_body(LoginSchema)
 def api_login(body: LoginSchema):
     email = body.email
     password = body.password
     user = models.User.authenticate_and_get(email, password)
     if user:
-        access_token = create_access_token(identity=email)
+        access_token = create_access_token(
+            identity=email,
+            additional_claims={"pw_ok": bool(user.password_changed_at), "uid": user.id},
+        )
         return jsonify(access_token=access_token, id=user.id), 200
     else:
         return jsonify({"message": "login failed"}), 401
@@ -56,9 +103,21 @@ def api_login(body: LoginSchema):
 @api.route("/shares")
 @login_required()
 def shares_list():
-    shares = Share.query.options(joinedload(Share.bets)).options(joinedload(Share.members)).all()
-    shares = [share.json for share in shares]
-    return jsonify(shares=shares)
+    # This is the largest payload the API serves.  Serialize one share at a
+    # time into the response instead of building the full dict list and the
+    # full JSON document in memory on top of the ORM instances.
+    def generate():
+        shares = db.session.scalars(
+            select(Share).options(selectinload(Share.bets), selectinload(Share.members))
+        )
+        yield b'{"shares":['
+        for index, share in enumerate(shares):
+            if index:
+                yield b","
+            yield orjson.dumps(share.json, default=json_default)
+        yield b"]}\n"
+
+    return app.response_class(stream_with_context(generate()), mimetype="application/json")
 
 
 @api.route("/shares/<int:share_id>/emails")
@@ -71,30 +130,55 @@ def share_email_list(share_id: int):
 @api.route("/members", methods=["GET"])
 @login_required()
 def member_list():
-    members = db.session.query(Member).options(joinedload(Member.share)).all()
-    result = []
-
+    # A pure projection: the response only needs a handful of scalar fields,
+    # so select them as tuples instead of materializing Member/Share/Station
+    # instances and reading Python properties per row.
+    query = (
+        db.session.query(
+            Member.id,
+            Member.phone,
+            Member.name,
+            Member.email,
+            Member.share_id,
+            Station.name,
+            func.min(Bet.start_date),
+        )
+        .outerjoin(Share, Member.share_id == Share.id)
+        .outerjoin(Station, Share.station_id == Station.id)
+        .outerjoin(Bet, Bet.share_id == Share.id)
+        .group_by(Member.id, Station.name)
+        .order_by(Member.id)
+    )
     if request.args.get("active"):
-        members = [member for member in members if member.share.currently_active]
-
-    for member in members:
-        json = member.json
-        json["station_name"] = member.share.station_name if member.share else ""
-        json["join_date"] = member.share.join_date if member.share else ""
-        result.append(json)
+        # Filter in the database instead of loading every member and
+        # checking `share.currently_active` in Python.
+        query = query.filter(Share.currently_active)
+
+    result = [
+        {
+            "id": member_id,
+            "phone": phone,
+            "name": name,
+            "email": email,
+            "share_id": share_id,
+            "station_name": station_name if share_id else "",
+            "join_date": join_date if share_id else "",
+        }
+        for member_id, phone, name, email, share_id, station_name, join_date in query
+    ]
     return jsonify(members=result)
 
 
-class MemberSchema(BaseModel, extra=Extra.forbid):
+class MemberSchema(msgspec.Struct, kw_only=True, forbid_unknown_fields=True):
     name: str
-    share_id: Optional[int]
-    email: Optional[str]
-    phone: Optional[str]
+    share_id: Optional[int] = None
+    email: Optional[str] = None
+    phone: Optional[str] = None
 
 
 @api.route("/members", methods=["POST"])
 @login_required()
-@validate()
+@validate_body(MemberSchema)
 def post_member(body: MemberSchema):
     share_id = body.share_id
     if not share_id:
@@ -106,19 +190,20 @@ def post_member(body: MemberSchema):
     return jsonify(member=member.json)
 
 
-class MemberPatchSchema(MemberSchema):
-    name: Optional[str]
+class MemberPatchSchema(msgspec.Struct, kw_only=True, forbid_unknown_fields=True):
+    name: Union[str, UnsetType] = UNSET
+    share_id: Union[int, None, UnsetType] = UNSET
+    email: Union[str, None, UnsetType] = UNSET
+    phone: Union[str, None, UnsetType] = UNSET
 
 
 @api.route("/members/<int:member_id>", methods=["PATCH"])
 @login_required()
-@validate()
+@validate_body(MemberPatchSchema)
 def patch_member(body: MemberPatchSchema, member_id: int):
     member = Member.get(member_id)
-    json = body.dict()
-    for key, value in json.items():
-        if value is not None:
-            setattr(member, key, value)
+    for key, value in changed_fields(body).items():
+        setattr(member, key, value)
     member.save()
     return jsonify(member=member.json)
 
@@ -126,34 +211,69 @@ def patch_member(body: MemberPatchSchema, member_id: int):
 @api.route("/members/<int:member_id>", methods=["DELETE"])
 @login_required()
 def member_delete(member_id: int):
-    member = Member.get(member_id)
-    member.delete()
+    result = db.session.execute(delete(Member).where(Member.id == member_id))
+    db.session.commit()
+    if not result.rowcount:
+        abort(404)
     return "", HTTPStatus.NO_CONTENT
 
 
+payment_maps_cache: TTLCache = TTLCache(maxsize=1, ttl=30)
+
+
+def get_payment_maps():
+    """Return `(deposit_map, expected_amount_map)` for all shares.
+
+    Both maps aggregate over the full deposit and bet tables, so they are
+    memoized on `flask.g` for the duration of the request and for up to 30
+    seconds across requests.  The cross-request cache is keyed on the highest
+    deposit id so that an import invalidates it, and the endpoints that
+    modify deposits or bets clear it explicitly.
+    """
+    maps = getattr(g, "_payment_maps", None)
+    if maps is None:
+        version = db.session.query(func.max(Deposit.id)).scalar()
+        maps = payment_maps_cache.get(version)
+        if maps is None:
+            maps = (Share.get_deposit_map(), Share.get_expected_amount_map())
+            payment_maps_cache[version] = maps
+        g._payment_maps = maps
+    return maps
+
+
 @api.route("/shares/payment_status", methods=["GET"])
 @login_required()
 def get_payment_list():
-    deposit_map = Share.get_deposit_map()
-    expected_amount_map = Share.get_expected_amount_map()
-    shares = (
-        db.session.query(Share)
-        .options(joinedload(Share.members))
-        .options(joinedload(Share.station))
+    deposit_map, expected_amount_map = get_payment_maps()
+    # Project the share fields the response needs and let Postgres build the
+    # display name (sorted member names), instead of loading Share, Member
+    # and Station instances just to read a few attributes.
+    rows = (
+        db.session.query(
+            Share.id,
+            Share.archived,
+            Share.note,
+            Station.name,
+            func.string_agg(Member.name, aggregate_order_by(literal(" & "), Member.name)),
+        )
+        .outerjoin(Station, Share.station_id == Station.id)
+        .outerjoin(Member, Member.share_id == Share.id)
+        .group_by(Share.id, Station.name)
+        .order_by(Share.id)
         .all()
     )
     res = []
-    for share in shares:
-        deposit_details = deposit_map.get(share.id, {})
+    for share_id, archived, note, station_name, name in rows:
+        deposit_details = deposit_map.get(share_id, {})
         share_payments = {
-            "id": share.id,
-            "name": share.name,
+            "id": share_id,
+            "name": name or "",
             "total_deposits": deposit_details.get("total_deposits", 0),
             "number_of_deposits": deposit_details.get("number_of_deposits", 0),
-            "archived": share.archived,
-            "note": share.note,
-            "station_name": share.station.name if share.station else "",
-            "expected_today": expected_amount_map.get(share.id, 0),
+            "archived": archived,
+            "note": note,
+            "station_name": station_name or "",
+            "expected_today": expected_amount_map.get(share_id, 0),
         }
         share_payments["difference_today"] = (
             share_payments["total_deposits"] - share_payments["expected_today"]
@@ -165,7 +285,7 @@ def get_payment_list():
 @api.route("/stations")
 @login_required()
 def get_stations():
-    stations = [station.json for station in models.Station.query.all()]
+    stations = [station.json for station in db.session.scalars(select(Station))]
     return jsonify(stations=stations)
 
 
@@ -196,31 +316,48 @@ def share_bets(share_id: int):
     return jsonify(bets=bets)
 
 
-class BetSchema(BaseModel, extra=Extra.forbid):
+class BetSchema(msgspec.Struct, kw_only=True, forbid_unknown_fields=True):
     value: Decimal
     start_date: date
-    end_date: Optional[date]
+    end_date: Optional[date] = None
+
+
+def bet_fields(body: BetSchema):
+    """Convert the schema's dates to datetimes to match the Bet columns.
+
+    With expire_on_commit=False the in-memory object is what gets
+    serialized into the response, so it has to hold the same types the
+    database stores.
+    """
+    fields = msgspec.structs.asdict(body)
+    for field in ("start_date", "end_date"):
+        if fields[field] is not None:
+            fields[field] = datetime.combine(fields[field], datetime.min.time())
+    return fields
 
 
 @api.route("/shares/<int:share_id>/bets", methods=["POST"])
-@validate()
+@validate_body(BetSchema)
 @login_required()
 def post_bet(body: BetSchema, share_id: int):
-    bet = Bet(share_id=share_id, **body.dict())
+    bet = Bet(share_id=share_id, **bet_fields(body))
     bet.save()
+    payment_maps_cache.clear()
     return jsonify(bet=bet.json)
 
 
 @api.route("/bets/<int:bet_id>", methods=["PUT"])
-@validate()
+@validate_body(BetSchema)
 @login_required()
 def put_bet(body: BetSchema, bet_id: int):
-    bet = Bet.query.get_or_404(bet_id)
-    json = body.dict()
+    bet = db.session.get(Bet, bet_id)
+    if bet is None:
+        abort(404)
 
-    for key, value in json.items():
+    for key, value in bet_fields(body).items():
         setattr(bet, key, value)
     bet.save()
+    payment_maps_cache.clear()
 
     return jsonify(bet=bet.json)
 
@@ -228,41 +365,46 @@ def put_bet(body: BetSchema, bet_id: int):
 @api.route("/shares/<int:share_id>/bets/<int:bet_id>", methods=["DELETE"])
 @login_required()
 def delete_bet(share_id: int, bet_id: int):
-    bet = Bet.query.get_or_404(bet_id)
-    bet.delete()
+    result = db.session.execute(delete(Bet).where(Bet.id == bet_id, Bet.share_id == share_id))
+    db.session.commit()
+    if not result.rowcount:
+        abort(404)
+    payment_maps_cache.clear()
     return jsonify(), 204
 
 
-class SharePatchSchema(BaseModel, extra=Extra.forbid):
-    note: Optional[str]
-    archived: Optional[bool]
+class SharePatchSchema(msgspec.Struct, kw_only=True, forbid_unknown_fields=True):
+    note: Union[str, None, UnsetType] = UNSET
+    archived: Union[bool, UnsetType] = UNSET
 
 
 @api.patch("/shares/<int:share_id>")
 @login_required()
-@validate()
+@validate_body(SharePatchSchema)
 def patch_share(body: SharePatchSchema, share_id: int):
     share = Share.get(share_id)
-    for key, value in body.dict().items():
+    for key, value in changed_fields(body).items():
         setattr(share, key, value)
     share.save()
     resp = share.json
     return jsonify(share=resp)
 
 
-class ShareSchema(BaseModel):
-    id: str
+class ShareSchema(msgspec.Struct, kw_only=True):
+    # Clients round-trip the share object they got from the API, where `id`
+    # is numeric, but some send it as a string; the handler never reads it.
+    id: Union[int, str]
     station_id: int
-    note: Optional[str]
-    archived: Optional[bool]
+    note: Optional[str] = None
+    archived: Optional[bool] = None
 
 
 @api.route("/shares/<int:share_id>", methods=["POST"])
 @login_required()
-@validate()
+@validate_body(ShareSchema)
 def post_shares_details(body: ShareSchema, share_id: int):
     share = Share.get(share_id)
-    json = body.dict()
+    json = msgspec.structs.asdict(body)
     for field in ["station_id", "note", "archived"]:
         if field in json:
             setattr(share, field, json.get(field))
@@ -271,65 +413,71 @@ def post_shares_details(body: ShareSchema, share_id: int):
     return jsonify(share=resp)
 
 
+class ShareCreateSchema(msgspec.Struct, kw_only=True, forbid_unknown_fields=True):
+    station_id: Optional[int] = None
+    note: Optional[str] = None
+    archived: bool = False
+
+
 @api.route("/shares", methods=["POST"])
 @login_required()
-def add_share():
-    json = request.get_json()
-    share = Share()
-    for field in json:
-        setattr(share, field, json.get(field))
-    share.save()
-    return jsonify(share=share.json), 201
+@validate_body(ShareCreateSchema)
+def add_share(body: ShareCreateSchema):
+    # One INSERT .. RETURNING round trip; only whitelisted fields can be set
+    # (the old handler setattr'ed every key of the raw JSON body).
+    values = msgspec.structs.asdict(body)
+    new_id = db.session.execute(insert(Share).values(**values).returning(Share.id)).scalar_one()
+    db.session.commit()
+    return jsonify(share={"id": new_id, "name": "", "bets": [], **values}), 201
 
 
-class DepositPatchSchema(BaseModel, extra=Extra.forbid):
-    ignore: Optional[bool]
-    is_security: Optional[bool]
+class DepositPatchSchema(msgspec.Struct, kw_only=True, forbid_unknown_fields=True):
+    ignore: Union[bool, UnsetType] = UNSET
+    is_security: Union[bool, UnsetType] = UNSET
 
 
 @api.patch("/deposits/<int:deposit_id>")
 @login_required()
-@validate()
+@validate_body(DepositPatchSchema)
 def patch_deposit(body: DepositPatchSchema, deposit_id: int):
     deposit = Deposit.get(deposit_id)
-    json = body.dict()
-    for field in json:
-        setattr(deposit, field, json.get(field))
+    for field, value in changed_fields(body).items():
+        setattr(deposit, field, value)
     deposit.save()
+    payment_maps_cache.clear()
     return jsonify(deposit=deposit.json)
 
 
 class DepositSchema(DepositPatchSchema):
-    amount: str
-    timestamp: str
+    amount: Decimal
+    timestamp: datetime
     title: str
     person_id: int
 
 
 @api.post("/deposits/")
 @login_required()
-@validate()
+@validate_body(DepositSchema)
 def post_deposit(body: DepositSchema):
-    current_user_email = get_jwt_identity()
-    current_user = User.query.filter(User.email == current_user_email).one()
-    deposit = Deposit(added_by=current_user.id)
-    json = body.dict()
-    for field in json:
-        setattr(deposit, field, json.get(field))
+    deposit = Deposit(added_by=g.user_id)
+    for field, value in changed_fields(body).items():
+        setattr(deposit, field, value)
     deposit.save()
+    payment_maps_cache.clear()
     return jsonify(deposit=deposit.json)
 
 
-class MergeSharesSchema(BaseModel):
+class MergeSharesSchema(msgspec.Struct, kw_only=True):
     share1: int
     share2: int
 
 
 @api.route("/shares/merge", methods=["POST"])
 @login_required()
-@validate()
+@validate_body(MergeSharesSchema)
 def merge_shares(body: MergeSharesSchema):
     merge(body.share1, body.share2)
+    payment_maps_cache.clear()
     return jsonify(message="success")
 
 
@@ -346,13 +494,13 @@ def user_list():
     return jsonify(users=users)
 
 
-class PatchUserModel(BaseModel):
-    password: constr(min_length=14)
+class PatchUserModel(msgspec.Struct, kw_only=True):
+    password: Annotated[str, msgspec.Meta(min_length=14)]
 
 
 @api.route("/users/<int:id>", methods=["PATCH"])
 @login_required()
-@validate()
+@validate_body(PatchUserModel)
 def modify_user(body: PatchUserModel, id: int):
     user = User.get(id)
     current_user_email = get_jwt_identity()
@@ -1,8 +1,9 @@
 import logging
 import os
 import sys
-from datetime import date
+from decimal import Decimal
 
+import orjson
 import sentry_sdk
 from flask import Flask
 from flask_bcrypt import Bcrypt
@@ -12,7 +13,6 @@ from flask_migrate import Migrate
 from flask_sqlalchemy import SQLAlchemy
 from sentry_sdk.integrations.flask import FlaskIntegration
 from sentry_sdk.integrations.sqlalchemy import SqlalchemyIntegration
-from simplejson import JSONEncoder
 
 secret_key = os.environ.get("SECRET_KEY")
 if secret_key is None:
@@ -36,12 +36,19 @@ sentry_sdk.init(
 app = Flask(__name__)
 app.config["SQLALCHEMY_DATABASE_URI"] = db_url
 app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
+    # Keep a warm pool instead of opening fresh connections under load,
+    # and let pre-ping weed out connections Heroku has dropped.
+    "pool_size": 10,
+    "max_overflow": 20,
+    "pool_pre_ping": True,
+    "pool_recycle": 300,
+}
 app.config["SECRET_KEY"] = secret_key
 app.config["JWT_ACCESS_TOKEN_EXPIRES"] = 60 * 60
 app.debug = os.environ.get("DEBUG", False)
 app.logger.addHandler(logging.StreamHandler(sys.stdout))
 app.logger.setLevel(logging.ERROR)
-app.json_encoder = JSONEncoder  # For automatic Decimal support
 
 jwt = JWTManager(app)
 
@@ -49,22 +56,39 @@ jwt = JWTManager(app)
 CORS(app, supports_credentials=True)
 
 
-class CustomJSONEncoder(JSONEncoder):
-    def default(self, obj):
-        try:
-            if isinstance(obj, date):
-                return obj.isoformat()
-            iterable = iter(obj)
-        except TypeError:
-            pass
-        else:
-            return list(iterable)
-        return JSONEncoder.default(self, obj)
+def json_default(obj):
+    """Serialization fallback for the types orjson does not handle natively."""
+    if isinstance(obj, Decimal):
+        return float(obj)
+    try:
+        iterable = iter(obj)
+    except TypeError:
+        raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+    return list(iterable)
 
 
-app.json_encoder = CustomJSONEncoder
+def jsonify(*args, **kwargs):
+    """orjson-backed drop-in for flask.jsonify.
 
-db = SQLAlchemy(app)
+    orjson serializes dates and large lists natively in C, which makes a
+    noticeable difference for the big payloads of `shares_list` and
+    `get_payment_list`; it returns bytes, so it cannot be plugged into
+    Flask's JSONEncoder-based machinery and replaces `jsonify` instead.
+    """
+    if args and kwargs:
+        raise TypeError("jsonify() behavior undefined when passed both args and kwargs")
+    if len(args) == 1:
+        payload = args[0]
+    else:
+        payload = list(args) or kwargs
+    return app.response_class(
+        orjson.dumps(payload, default=json_default) + b"\n", mimetype="application/json"
+    )
+
+
+# Without expire_on_commit=False every `.save()` expires the instance and the
+# `.json` access right after re-SELECTs the row we just wrote.
+db = SQLAlchemy(app, session_options={"expire_on_commit": False})
 bcrypt = Bcrypt(app)
 migrate = Migrate(app, db)
 
@@ -1,3 +1,4 @@
+from solawi.app import db
 from solawi.models import Share
 
 
@@ -9,13 +10,15 @@ def merge(first_share_id, second_share_id):
     if not first_share_id or not second_share_id:
         return None
 
-    first_share = Share.query.get(first_share_id)
-    second_share = Share.query.get(second_share_id)
+    first_share = db.session.get(Share, first_share_id)
+    second_share = db.session.get(Share, second_share_id)
 
     first_share.people += list(second_share.people)
     first_share.members += list(second_share.members)
     first_share.bets += list(second_share.bets)
-    first_share.station_id = first_share.station_id or second_share.station_id
+    # Assign the relationship rather than the foreign key so the in-memory
+    # object stays coherent without a post-commit reload.
+    first_share.station = first_share.station or second_share.station
     first_share.note = " \n --- \n ".join(without_nones([first_share.note, second_share.note]))
 
     first_share.save()
@@ -1,16 +1,35 @@
-""" the models """
+"""the models"""
+
 import datetime
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
 from datetime import date
 from decimal import Decimal
 
-from sqlalchemy import UniqueConstraint, func, text
+from gevent import monkey
+from sqlalchemy import UniqueConstraint, func, or_, select, text
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.hybrid import hybrid_property
-from sqlalchemy.orm import class_mapper
+from sqlalchemy.orm import class_mapper, selectinload
 from sqlalchemy.orm.exc import NoResultFound
 
 from solawi.app import app, bcrypt, db
 
+# bcrypt verification costs 100-200ms of CPU per call.  Funneling it through
+# a small pool keeps a login storm from occupying every server worker at
+# once: at most two checks hash concurrently, the rest queue.  Under the
+# gevent gunicorn worker (see Procfile) the stdlib executor's "threads"
+# would be greenlets on the event-loop thread and every hash would still
+# block the whole worker, so use gevent's executor there: it runs tasks on
+# real OS threads, and the C bcrypt implementation releases the GIL while
+# hashing.
+if monkey.is_module_patched("threading"):
+    from gevent.threadpool import ThreadPoolExecutor as GeventThreadPoolExecutor
+
+    password_check_pool = GeventThreadPoolExecutor(max_workers=2)
+else:
+    password_check_pool = ThreadPoolExecutor(max_workers=2)
+
 
 class BaseModel:
     def save(self):
@@ -34,7 +53,7 @@ class BaseModel:
 
     @classmethod
     def get(cls, id):
-        return db.session.query(cls).get(id)
+        return db.session.get(cls, id)
 
     @property
     def json(self):
@@ -139,6 +158,12 @@ class Share(db.Model, BaseModel):
     note = db.Column(db.Text)
     archived = db.Column(db.Boolean, default=False)
 
+    @classmethod
+    def get(cls, id):
+        """Fetch a share together with the relationships its `.json` needs,
+        so serializing a response does not fall back to lazy loads."""
+        return db.session.get(cls, id, options=[selectinload(cls.bets), selectinload(cls.members)])
+
     @property
     def json(self):
         bets = [bet.json for bet in self.bets]
@@ -218,10 +243,16 @@ class Share(db.Model, BaseModel):
     def expected_today(self):
         return sum(bet.expected_today for bet in self.bets)
 
-    @property
+    @hybrid_property
     def currently_active(self):
         return any([bet.currently_active for bet in self.bets])
 
+    @currently_active.expression
+    def currently_active(cls):
+        return cls.bets.any(
+            or_(Bet.end_date.is_(None), func.date(Bet.end_date) > func.current_date())
+        )
+
     @staticmethod
     def get_deposit_map() -> dict[int, dict[str, str]]:
         """
@@ -293,7 +324,7 @@ class Station(db.Model, BaseModel):
 
     @staticmethod
     def get_by_name(name):
-        return db.session.query(Station).filter_by(name=name).first()
+        return db.session.scalars(select(Station).where(Station.name == name)).first()
 
 
 class Person(db.Model, BaseModel):
@@ -346,12 +377,13 @@ class User(db.Model, BaseModel):
 
     @staticmethod
     def get(id):
-        return db.session.query(User).get(id)
+        return db.session.get(User, id)
 
     @staticmethod
     def get_by_email(email):
         email = email.lower()
-        return db.session.query(User).filter(User.email == email).filter(User.active).one_or_none()
+        statement = select(User).where(User.email == email).where(User.active)
+        return db.session.execute(statement).scalar_one_or_none()
 
     @hybrid_property
     def password(self):
@@ -365,7 +397,14 @@ class User(db.Model, BaseModel):
     @staticmethod
     def authenticate_and_get(email, password):
         user = User.get_by_email(email)
-        if user is not None and user.check_password(password):
-            return user
-        else:
+        if user is None:
+            return None
+        future = password_check_pool.submit(user.check_password, password)
+        try:
+            password_ok = future.result(timeout=2.0)
+        except FutureTimeoutError:
+            # The pool is saturated; fail the attempt and cancel the queued
+            # check rather than still hashing for a client that is gone.
+            future.cancel()
             return None
+        return user if password_ok else None
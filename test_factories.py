@@ -30,7 +30,7 @@ class BetFactory(factory.alchemy.SQLAlchemyModelFactory):
         sqlalchemy_session = db.session  # the SQLAlchemy session object
         sqlalchemy_session_persistence = "commit"
 
-    start_date = datetime.date(2018, 1, 1)
+    start_date = datetime.datetime(2018, 1, 1)
     end_date = None
     share = factory.SubFactory(ShareFactory)
     value = 90
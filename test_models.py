@@ -1,7 +1,8 @@
 from datetime import date, datetime
 from decimal import Decimal
 
-from solawi.models import Bet, Deposit, Person, User
+from solawi.app import db
+from solawi.models import Bet, Deposit, Person, Share, User
 from test_factories import (
     BetFactory,
     DepositFactory,
@@ -19,6 +20,9 @@ class DepositTest(DBTest):
             title="June Payment John Doe", timestamp=datetime(2018, 1, 1, 12, 0), amount=80.21
         )
         deposit.save()
+        # The session no longer expires on commit, so reload explicitly to
+        # assert the persisted (database-normalized) state.
+        db.session.refresh(deposit)
 
         expected = {
             "added_by": None,
@@ -86,6 +90,21 @@ class ShareTest(DBTest):
 
         assert share.json == expected
 
+    def test_json_is_loaded_eagerly(self):
+        share = ShareFactory.create()
+        BetFactory.create(share=share)
+        MemberFactory.create(name="John Doe", share=share)
+        db.session.expunge_all()
+
+        loaded = Share.get(share.id)
+        # Detach the instance: building .json must not require any further
+        # lazy loads, or this raises DetachedInstanceError.
+        db.session.expunge(loaded)
+
+        json = loaded.json
+        assert json["name"] == "John Doe"
+        assert len(json["bets"]) == 1
+
     def test_name(self):
         share = ShareFactory()
         MemberFactory(name="Bob", share=share)
@@ -1,8 +1,6 @@
 from datetime import date, datetime
 from unittest.mock import patch
 
-from flask_jwt_extended import create_access_token
-
 from solawi.app import app, db
 from solawi.models import Bet, Deposit, Member, Share, User
 from test_factories import (
@@ -14,7 +12,7 @@ from test_factories import (
     StationFactory,
     UserFactory,
 )
-from test_helpers import AuthorizedTest, DBTest
+from test_helpers import AuthorizedTest, DBTest, access_token_for
 
 
 class AuthorizedViewsTests(AuthorizedTest):
@@ -146,6 +144,25 @@ class AuthorizedViewsTests(AuthorizedTest):
         self.assertEqual(updated_member.name, "Paul Wild")
         self.assertEqual(response.json["member"]["name"], "Paul Wild")
 
+    def test_change_member_null_clears_email(self):
+        member = MemberFactory.create(name="Paul Wild", email="paul@example.org")
+
+        response = self.app.patch(f"/api/v1/members/{member.id}", json={"email": None})
+
+        updated_member = Member.get(member.id)
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(updated_member.email)
+        # fields the request did not mention stay untouched
+        self.assertEqual(updated_member.name, "Paul Wild")
+
+    def test_change_member_rejects_null_name(self):
+        member = MemberFactory.create(name="Paul Wild")
+
+        response = self.app.patch(f"/api/v1/members/{member.id}", json={"name": None})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Member.get(member.id).name, "Paul Wild")
+
     def test_cannot_change_member_id(self):
         member = MemberFactory.create(name="Paul Wild / Paula Wilder")
 
@@ -220,9 +237,7 @@ class UserManagementViewsTests(DBTest):
     def _login_as_user(self, user):
         self.app = app.test_client()
         with app.app_context():
-            self.app.environ_base[
-                "HTTP_AUTHORIZATION"
-            ] = f"Bearer {create_access_token(identity=user.email)}"
+            self.app.environ_base["HTTP_AUTHORIZATION"] = f"Bearer {access_token_for(user)}"
 
     def test_modify_user(self):
         user: User = UserFactory.create(password="hunter2")
@@ -364,6 +379,23 @@ class SharesTests(AuthorizedTest):
         self.assertEqual(response.json, expected)
 
 
+class ShareCreateTests(AuthorizedTest):
+    def test_create_share(self):
+        station = StationFactory.create()
+
+        response = self.app.post("/api/v1/shares", json={"note": "new", "station_id": station.id})
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json["share"]["note"], "new")
+        self.assertEqual(Share.query.count(), 1)
+
+    def test_create_share_rejects_unknown_fields(self):
+        response = self.app.post("/api/v1/shares", json={"id": 12})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Share.query.count(), 0)
+
+
 class PaymentStatusTests(AuthorizedTest):
     def test_get_shares(self):
         # The tests for making sure that the right amout is calculated for the
@@ -400,6 +432,44 @@ class PaymentStatusTests(AuthorizedTest):
         self.assertEqual(response.json, expected)
 
 
+class PaymentStatusCacheTests(AuthorizedTest):
+    def test_posted_deposit_shows_up_in_payment_status(self):
+        share = ShareFactory.create()
+        person = PersonFactory.create(share=share)
+        DepositFactory.create(person=person, amount=50)
+
+        first = self.app.get("/api/v1/shares/payment_status")
+        self.assertEqual(first.json["shares"][0]["total_deposits"], 50.0)
+
+        new_deposit = {
+            "amount": 25,
+            "title": "Second Deposit",
+            "timestamp": "2022-04-07T00:00:00",
+            "person_id": person.id,
+        }
+        response = self.app.post("/api/v1/deposits/", json=new_deposit)
+        self.assertEqual(response.status_code, 200)
+
+        second = self.app.get("/api/v1/shares/payment_status")
+        self.assertEqual(second.json["shares"][0]["total_deposits"], 75.0)
+
+    def test_patched_deposit_shows_up_in_payment_status(self):
+        # Editing a deposit leaves max(deposit.id) unchanged, so this only
+        # works through the explicit cache clear in patch_deposit.
+        share = ShareFactory.create()
+        person = PersonFactory.create(share=share)
+        deposit = DepositFactory.create(person=person, amount=50, ignore=False)
+
+        first = self.app.get("/api/v1/shares/payment_status")
+        self.assertEqual(first.json["shares"][0]["total_deposits"], 50.0)
+
+        response = self.app.patch(f"/api/v1/deposits/{deposit.id}", json={"ignore": True})
+        self.assertEqual(response.status_code, 200)
+
+        second = self.app.get("/api/v1/shares/payment_status")
+        self.assertEqual(second.json["shares"][0]["total_deposits"], 0)
+
+
 class ShareDetailsTests(AuthorizedTest):
     def test_get_share_details(self):
         share = ShareFactory.create()
@@ -432,6 +502,17 @@ class ShareDetailsTests(AuthorizedTest):
         self.assertEqual(response.status_code, 200)
         self.assertTrue(updated_share.archived)
 
+    def test_patch_share_null_clears_note(self):
+        share = ShareFactory.create(note="outdated", archived=True)
+
+        response = self.app.patch(f"/api/v1/shares/{share.id}", json={"note": None})
+
+        updated_share = Share.get(share.id)
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(updated_share.note)
+        # fields the request did not mention stay untouched
+        self.assertTrue(updated_share.archived)
+
     def test_patch_share_validates_request(self):
         share = ShareFactory.create()
 
@@ -440,6 +521,24 @@ class ShareDetailsTests(AuthorizedTest):
 
         self.assertEqual(response.status_code, 400)
 
+    def test_post_share_details(self):
+        share = ShareFactory.create()
+        new_station = StationFactory.create()
+
+        # clients send back the share object they fetched, numeric id included
+        payload = {
+            "id": share.id,
+            "station_id": new_station.id,
+            "note": "moved",
+            "archived": False,
+        }
+        response = self.app.post(f"/api/v1/shares/{share.id}", json=payload)
+
+        updated_share = Share.get(share.id)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(updated_share.station_id, new_station.id)
+        self.assertEqual(updated_share.note, "moved")
+
 
 class BetDetailsTests(AuthorizedTest):
     def test_delete_bet(self):
@@ -477,20 +576,7 @@ class BetDetailsTests(AuthorizedTest):
         response = self.app.put(f"/api/v1/bets/{bet.id}", json=payload)
 
         self.assertEqual(response.status_code, 400)
-        self.assertEqual(
-            response.json,
-            {
-                "validation_error": {
-                    "body_params": [
-                        {
-                            "loc": ["share_id"],
-                            "msg": "extra fields not permitted",
-                            "type": "value_error.extra",
-                        }
-                    ]
-                }
-            },
-        )
+        self.assertIn("share_id", response.json["validation_error"])
 
     def test_create_bet(self):
         share = ShareFactory.create()